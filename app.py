@@ -3,26 +3,136 @@
 Railway-deployable Flask web app for RateMySite analysis with Excel export
 """
 
-import os
+import io
 import json
+import os
+import threading
+import time
 import uuid
-from typing import List, Generator, Dict, Any
+from typing import List, Generator, Dict, Any, Optional, Tuple
 
+import orjson
 from flask import Flask, render_template, request, Response, stream_with_context, send_file, jsonify
-from utils.scraper import stream_analysis
+from utils.scraper import REDIS_SOCKET_TIMEOUT, stream_analysis
 from utils.excel_export import create_excel_report
 
 app = Flask(__name__)
 
 # Configure for Railway deployment
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
-app.config['UPLOAD_FOLDER'] = 'static/downloads'
 
-# Ensure downloads directory exists
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+SESSION_TTL = 3600  # seconds an analysis session is kept for download
+
+
+class SessionStore:
+    """
+    Analysis session storage shared across workers and replicas.
+
+    Results are kept column-wise: one list of cell values per report field, in
+    the order results arrived, ready to be written out as-is by the Excel export.
+    Sessions live in Redis (``rms:session:{id}:meta`` plus one
+    ``rms:session:{id}:col:{field}`` list per field, all with a TTL) when REDIS_URL
+    is set, otherwise in a process-local dict for local development.
+    """
+
+    KEY_PREFIX = "rms:session:"
+
+    def __init__(self, fields: List[str], redis_url: Optional[str] = None, ttl: int = SESSION_TTL):
+        self.fields = fields
+        self.ttl = ttl
+        self._redis = None
+        self._local: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()  # guards _local across request threads
+        if redis_url:
+            import redis
+            # Scraped text may carry lone surrogates; store them as "?" rather than fail
+            self._redis = redis.Redis.from_url(
+                redis_url,
+                socket_timeout=REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+                encoding_errors="replace",
+            )
+
+    def _meta_key(self, sid: str) -> str:
+        return f"{self.KEY_PREFIX}{sid}:meta"
+
+    def _column_key(self, sid: str, field: str) -> str:
+        return f"{self.KEY_PREFIX}{sid}:col:{field}"
+
+    def _purge_expired(self) -> None:
+        """Drop local sessions whose TTL has passed (e.g. downloads that never happened); call with _lock held"""
+        now = time.time()
+        for sid in [s for s, v in self._local.items() if v["expires"] < now]:
+            del self._local[sid]
+
+    def create(self, sid: str, urls: List[str]) -> None:
+        """Register a new session for the given URLs"""
+        if self._redis is not None:
+            self._redis.setex(self._meta_key(sid), self.ttl, orjson.dumps({"urls": urls}))
+            return
+        with self._lock:
+            self._purge_expired()
+            self._local[sid] = {
+                "urls": urls,
+                "columns": {field: [] for field in self.fields},
+                "expires": time.time() + self.ttl,
+            }
+
+    def append_result(self, sid: str, data: Dict[str, Any]) -> None:
+        """Append one parsed result to the session, one cell per field"""
+        cells = {}
+        for field in self.fields:
+            value = data.get(field, "-")
+            cells[field] = "-" if value is None else str(value)
+        
+        if self._redis is not None:
+            pipe = self._redis.pipeline()
+            for field, value in cells.items():
+                key = self._column_key(sid, field)
+                pipe.rpush(key, value)
+                pipe.expire(key, self.ttl)
+            pipe.execute()
+            return
+        with self._lock:
+            if sid in self._local:
+                columns = self._local[sid]["columns"]
+                for field, value in cells.items():
+                    columns[field].append(value)
+
+    def get(self, sid: str) -> Optional[Dict[str, Any]]:
+        """Return ``{"urls": [...], "columns": {field: [...]}}`` or None if unknown/expired"""
+        if self._redis is not None:
+            pipe = self._redis.pipeline()
+            pipe.get(self._meta_key(sid))
+            for field in self.fields:
+                pipe.lrange(self._column_key(sid, field), 0, -1)
+            meta, *columns = pipe.execute()
+            if meta is None:
+                return None
+            session = orjson.loads(meta)
+            session["columns"] = {
+                field: [v.decode() for v in values]
+                for field, values in zip(self.fields, columns)
+            }
+            return session
+        with self._lock:
+            session = self._local.get(sid)
+            if session is None or session["expires"] < time.time():
+                return None
+            # Copies, so a stream still appending can't change them mid-export
+            return {
+                "urls": list(session["urls"]),
+                "columns": {field: list(values) for field, values in session["columns"].items()},
+            }
+
+    def delete(self, sid: str) -> None:
+        """Remove the session"""
+        if self._redis is not None:
+            self._redis.delete(self._meta_key(sid), *(self._column_key(sid, f) for f in self.fields))
+        else:
+            with self._lock:
+                self._local.pop(sid, None)
 
-# Store analysis results temporarily (in production, use Redis or database)
-analysis_cache = {}
 
 TABLE_ROWS = [
     ("Company", "Company"),
@@ -39,6 +149,18 @@ TABLE_ROWS = [
     ("Value Prop Score", "Value Proposition"),
 ]
 
+# Store analysis results between /stream and /download (Redis in production)
+analysis_cache = SessionStore([key for key, _ in TABLE_ROWS], os.environ.get("REDIS_URL"))
+
+def sse(event: str, data: Dict[str, Any]) -> bytes:
+    """Format Server-Sent Event"""
+    try:
+        payload = orjson.dumps(data)
+    except TypeError:
+        # orjson rejects lone surrogates (e.g. in scraped page text); json escapes them
+        payload = json.dumps(data).encode()
+    return b"event: %s\ndata: %s\n\n" % (event.encode(), payload)
+
 @app.route("/")
 def index():
     """Main page"""
@@ -53,42 +175,28 @@ def stream():
     
     # Generate unique session ID for this analysis
     session_id = str(uuid.uuid4())
-    analysis_cache[session_id] = {"urls": urls, "results": []}
+    analysis_cache.create(session_id, urls)
     
-    def enhanced_stream():
-        for event_data in stream_analysis(urls):
-            # Cache results for Excel export
-            if '"event": "result"' in event_data and '"data":' in event_data:
-                try:
-                    # Extract result data for caching
-                    lines = event_data.strip().split('\n')
-                    for line in lines:
-                        if line.startswith('data: '):
-                            data = json.loads(line[6:])  # Remove 'data: ' prefix
-                            if 'data' in data and data.get('data'):
-                                analysis_cache[session_id]["results"].append(data['data'])
-                            break
-                except (json.JSONDecodeError, KeyError):
-                    pass
-            
-            # Add session ID to events for frontend tracking
-            if '"event": "init"' in event_data:
+    def frame(event: str, data: Dict[str, Any]) -> Tuple[str, Dict[str, Any], bytes]:
+        # Runs on the scraper's worker threads for per-URL events, in URL order
+        if event == "init":
+            # Session ID lets the frontend request the Excel export
+            data["session_id"] = session_id
+        return event, data, sse(event, data)
+    
+    def generate() -> Generator[bytes, None, None]:
+        for event, data, chunk in stream_analysis(urls, frame=frame):
+            if event == "result" and data.get("data"):
+                # Cache results for Excel export - here, not in frame(), so a slow
+                # Redis only holds up this stream and not the scraper's release lock
                 try:
-                    lines = event_data.strip().split('\n')
-                    for i, line in enumerate(lines):
-                        if line.startswith('data: '):
-                            data = json.loads(line[6:])
-                            data['session_id'] = session_id
-                            lines[i] = f'data: {json.dumps(data)}'
-                            event_data = '\n'.join(lines) + '\n'
-                            break
-                except (json.JSONDecodeError, KeyError):
-                    pass
-            
-            yield event_data
+                    analysis_cache.append_result(session_id, data["data"])
+                except Exception as e:
+                    app.logger.error(f"Error caching result for {session_id}: {e}")
+            yield chunk
     
     return Response(
-        stream_with_context(enhanced_stream()), 
+        stream_with_context(generate()), 
         mimetype="text/event-stream",
         headers={
             'Cache-Control': 'no-cache',
@@ -100,43 +208,31 @@ def stream():
 @app.route("/download/excel/<session_id>")
 def download_excel(session_id):
     """Download analysis results as Excel file"""
-    if session_id not in analysis_cache:
+    cache_data = analysis_cache.get(session_id)
+    if cache_data is None:
         return jsonify({"error": "Session not found or expired"}), 404
     
-    cache_data = analysis_cache[session_id]
-    results = cache_data["results"]
+    columns = cache_data["columns"]
     
-    if not results:
+    if not any(columns.values()):
         return jsonify({"error": "No results available for download"}), 400
     
     try:
-        # Generate Excel file
+        # Generate Excel file in memory and stream it straight to the client
         filename = f"ratemysite_analysis_{session_id[:8]}.xlsx"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        bio = io.BytesIO()
+        create_excel_report(columns, bio, TABLE_ROWS)
+        bio.seek(0)
         
-        create_excel_report(results, filepath, TABLE_ROWS)
+        analysis_cache.delete(session_id)
         
-        # Send file and clean up
-        def cleanup():
-            try:
-                os.remove(filepath)
-                # Clean up cache after some time (in production, use proper cleanup)
-                if session_id in analysis_cache:
-                    del analysis_cache[session_id]
-            except OSError:
-                pass
-        
-        response = send_file(
-            filepath,
+        return send_file(
+            bio,
             as_attachment=True,
             download_name=filename,
             mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         )
         
-        # Schedule cleanup after response
-        response.call_on_close(cleanup)
-        return response
-        
     except Exception as e:
         app.logger.error(f"Error generating Excel file: {e}")
         return jsonify({"error": "Failed to generate Excel file"}), 500
@@ -144,8 +240,9 @@ def download_excel(session_id):
 @app.route("/api/cache/<session_id>")
 def get_cache(session_id):
     """Get cached analysis data (for debugging)"""
-    if session_id in analysis_cache:
-        return jsonify(analysis_cache[session_id])
+    cache_data = analysis_cache.get(session_id)
+    if cache_data is not None:
+        return jsonify(cache_data)
     return jsonify({"error": "Session not found"}), 404
 
 @app.route("/health")
@@ -31,7 +31,6 @@ pip install -r requirements.txt
 
 # Create necessary directories
 echo "📁 Creating directories..."
-mkdir -p static/downloads
 mkdir -p logs
 
 # Run tests
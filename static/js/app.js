@@ -235,11 +235,13 @@
       setProgress(base + within, `[${index}/${total}] ${phase}`);
     });
 
-    es.addEventListener('debug', (e) => {
-      const { index, message } = JSON.parse(e.data);
-      if (message) {
-        addLog(formatLogLine(`  [${index}] ${message}`));
-      }
+    es.addEventListener('debug_batch', (e) => {
+      const { index, messages } = JSON.parse(e.data);
+      (messages || []).forEach(message => {
+        if (message) {
+          addLog(formatLogLine(`  [${index}] ${message}`));
+        }
+      });
     });
 
     es.addEventListener('result', (e) => {
@@ -21,6 +21,9 @@ def test_imports():
         import openpyxl
         print("✅ OpenPyXL imported successfully")
         
+        import xlsxwriter
+        print("✅ XlsxWriter imported successfully")
+        
         from utils.scraper import stream_analysis
         print("✅ Scraper module imported successfully")
         
@@ -36,6 +39,7 @@ def test_file_structure():
     """Test that all required files exist"""
     required_files = [
         'app.py',
+        'wsgi.py',
         'requirements.txt',
         'Procfile',
         'static/css/styles.css',
@@ -80,6 +84,164 @@ def test_app_creation():
         print(f"❌ App creation error: {e}")
         return False
 
+def _reference_fields(raw):
+    """Per-label extraction the single-pass scan must agree with"""
+    from utils.scraper import _FIELD_SPECS, _grab_block, _grab_score, _score_pattern, _block_pattern
+    return {
+        field: (_grab_score(raw, labels) if pattern is _score_pattern
+                else _grab_block(raw, labels, multiline=pattern is _block_pattern))
+        for field, labels, pattern in _FIELD_SPECS
+    }
+
+def test_field_parsing():
+    """Test that the single-pass field scan matches per-label extraction"""
+    import random
+    from utils.scraper import _FIELD_SPECS, _parse_fields, _scan_fields
+    
+    texts = [
+        "",
+        "Company: Acme Inc\nOverall Score: 82\nDescription: Sells anvils.\n\nConsumer Score: 75",
+        # "Score" nested inside other labels - must still be seen where it occurs
+        "Consumer Score: 70\nDeveloper Score - 64\nScore: 55",
+        "Customer Score 61\nConsumer Score 72\nTotal Score 90",
+        "Design Score: 40\nVisual Design Score: 45\nUX Score: 50\nUsability Score: 51",
+        "site name: lower case\nCOMPANY: UPPER CASE\ntrust score: 33\nCREDIBILITY SCORE: 34",
+        "Description of Website: First line\nsecond line\nValue Prop Score: 88\nClarity Score:91",
+        "Site Description - spans\nmany lines\n\nReadability Score: 12\nEngineer Score: 1000",
+        "Investor Score: abc\nInvestor Score: 77\nValue Proposition Score: 5",
+    ]
+    # Lowercasing changes the length, so _parse_fields must fall back to per-label search
+    fallback_text = "Company: \u0130stanbul Widgets\nOverall Score: 67\nDescription: \u0130zmir office"
+    texts.append(fallback_text)
+    
+    rng = random.Random(1234)
+    labels = [lab for _, field_labels, _ in _FIELD_SPECS for lab in field_labels]
+    pieces = labels + [lab.upper() for lab in labels] + [lab.lower() for lab in labels]
+    pieces += [":", " - ", " ", "\n", "\n\n", "42", "7", "100", "word", "Heading: x", "\u0130"]
+    for _ in range(2000):
+        texts.append("".join(rng.choice(pieces) for _ in range(rng.randint(1, 25))))
+    
+    mismatches = []
+    for raw in texts:
+        expected = _reference_fields(raw)
+        parsed = _parse_fields("https://example.com", raw)
+        got = {field: parsed[field] for field in expected}
+        if got != expected:
+            mismatches.append((raw, expected, got))
+    
+    assert _scan_fields(fallback_text) is None, "length-changing text should skip the single-pass scan"
+    nested = _parse_fields("https://example.com", texts[2])
+    assert nested["Overall Score"] == "70" and nested["Consumer Score"] == "70"
+    
+    for raw, expected, got in mismatches[:5]:
+        print(f"❌ {raw!r}: expected {expected}, got {got}")
+    assert not mismatches, f"{len(mismatches)} of {len(texts)} texts parsed differently"
+    print(f"✅ {len(texts)} texts parsed identically")
+    return True
+
+def test_result_cache():
+    """Test the per-day scrape cache and when _analyze_url writes to it"""
+    from datetime import datetime, timezone
+    from unittest import mock
+    import utils.scraper as scraper
+    
+    cache = scraper._ResultCache(maxsize=2)
+    day1 = mock.Mock(now=mock.Mock(return_value=datetime(2026, 1, 1, 12, tzinfo=timezone.utc)))
+    day2 = mock.Mock(now=mock.Mock(return_value=datetime(2026, 1, 2, 0, 1, tzinfo=timezone.utc)))
+    with mock.patch.object(scraper, "datetime", day1):
+        cache.set("https://a.com", "text a")
+        assert cache.get("https://a.com") == "text a"
+        assert cache._key("https://a.com").endswith(":20260101")
+    with mock.patch.object(scraper, "datetime", day2):
+        assert cache.get("https://a.com") is None, "yesterday's entry was reused"
+        cache.set("https://b.com", "text b")
+        cache.set("https://c.com", "text c")
+        cache.get("https://b.com")  # b is now more recent than c
+        cache.set("https://d.com", "text d")
+        assert cache.get("https://c.com") is None, "least recently used entry kept past maxsize"
+        assert cache.get("https://b.com") == "text b" and cache.get("https://d.com") == "text d"
+    print("✅ Result cache keys by day and evicts least recently used entries")
+    
+    pages = {"https://good.com": "Overall Score: 77", "https://failed.com": "Welcome to RateMySite"}
+    fresh = scraper._ResultCache()
+    with mock.patch.object(scraper, "result_cache", fresh), \
+            mock.patch.object(scraper, "_analyze_one_with_debugging",
+                              lambda browser, url, timeout=0: (pages[url], [])):
+        for idx, url in enumerate(pages, start=1):
+            scraper._analyze_url(idx, len(pages), url, scraper._BrowserSession(), lambda event: None)
+    assert fresh.get("https://good.com") == "Overall Score: 77"
+    assert fresh.get("https://failed.com") is None, "page without an Overall Score was cached"
+    print("✅ Only scrapes with an Overall Score are cached")
+    return True
+
+def _check_stream_and_download(store):
+    """Run /stream with stubbed scrapes finishing out of order, then download the report"""
+    import io
+    import json
+    import time
+    from unittest import mock
+    import openpyxl
+    import app as app_module
+    import utils.scraper as scraper
+    
+    def fake_analyze(browser, url, timeout=0):
+        if "slow" in url:
+            time.sleep(0.3)
+        if "broken" in url:
+            raise RuntimeError("scrape exploded")
+        return f"Company: {url}\nOverall Score: 81\nConsumer Score: 64", []
+    
+    urls = ["slow.example.com", "fast.example.com", "broken.example.com", "quick.example.com"]
+    with mock.patch.object(scraper, "_analyze_one_with_debugging", fake_analyze), \
+            mock.patch.object(scraper, "result_cache", scraper._ResultCache()), \
+            mock.patch.object(scraper, "PARALLEL_WORKERS", 4), \
+            mock.patch.object(app_module, "analysis_cache", store), \
+            app_module.app.test_client() as client:
+        body = client.get("/stream", query_string=[("u", u) for u in urls]).get_data(as_text=True)
+        events = []
+        for block in body.strip().split("\n\n"):
+            event_line, data_line = block.split("\n")
+            events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+        
+        assert events[0][0] == "init", f"stream starts with {events[0][0]}"
+        assert [e for e, _ in events].count("done") == 1 and events[-1][0] == "done", "expected one trailing done"
+        indices = [data["index"] for _, data in events[1:-1]]
+        assert indices == sorted(indices), f"per-URL events out of order: {indices}"
+        results = [data for event, data in events if event == "result"]
+        assert [(r["index"], "data" in r) for r in results] == [(1, True), (2, True), (3, False), (4, True)]
+        assert "scrape exploded" in results[2]["error"]
+        
+        session_id = events[0][1]["session_id"]
+        response = client.get(f"/download/excel/{session_id}")
+        assert response.status_code == 200, f"download returned {response.status_code}"
+        ws = openpyxl.load_workbook(io.BytesIO(response.data)).active
+        rows = {row[0]: list(row[1:]) for row in ws.iter_rows(min_row=5, values_only=True) if row[0]}
+        assert rows["Category"] == ["slow.example.com", "fast.example.com", "quick.example.com"]
+        assert rows["Company"] == ["https://slow.example.com", "https://fast.example.com", "https://quick.example.com"]
+        assert rows["Overall Score"] == ["81"] * 3
+        assert rows["Audience Perspective → Consumer"] == ["64"] * 3
+        assert client.get(f"/download/excel/{session_id}").status_code == 404, "session kept after download"
+
+def test_stream_and_download():
+    """Test streaming analysis order and the Excel export for both session stores"""
+    from unittest import mock
+    from app import SessionStore, TABLE_ROWS
+    
+    fields = [key for key, _ in TABLE_ROWS]
+    _check_stream_and_download(SessionStore(fields))
+    print("✅ Stream and download work with the in-memory session store")
+    
+    try:
+        import fakeredis
+    except ImportError:
+        print("⚠️ fakeredis not installed, skipping the Redis session store")
+        return True
+    with mock.patch("redis.Redis", fakeredis.FakeRedis):
+        store = SessionStore(fields, "redis://localhost:6379/0")
+    _check_stream_and_download(store)
+    print("✅ Stream and download work with the Redis session store")
+    return True
+
 def main():
     """Run all tests"""
     print("🧪 Running application tests...\n")
@@ -87,7 +249,10 @@ def main():
     tests = [
         ("File Structure", test_file_structure),
         ("Module Imports", test_imports),
-        ("App Creation", test_app_creation)
+        ("App Creation", test_app_creation),
+        ("Field Parsing", test_field_parsing),
+        ("Result Cache", test_result_cache),
+        ("Stream And Download", test_stream_and_download),
     ]
     
     passed = 0
@@ -95,7 +260,12 @@ def main():
     
     for test_name, test_func in tests:
         print(f"\n📋 Testing {test_name}...")
-        if test_func():
+        try:
+            ok = test_func()
+        except AssertionError as e:
+            print(f"❌ {e}")
+            ok = False
+        if ok:
             print(f"✅ {test_name} passed")
             passed += 1
         else:
@@ -5,171 +5,168 @@ Excel export functionality for RateMySite analysis
 
 import pandas as pd
 from datetime import datetime
-from typing import List, Dict, Any, Tuple
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils.dataframe import dataframe_to_rows
+from typing import IO, List, Dict, Any, Tuple, Union
+import xlsxwriter
 
-def create_excel_report(results: List[Dict[str, Any]], filepath: str, table_rows: List[Tuple[str, str]]) -> None:
+Output = Union[str, IO[bytes]]
+
+def _domain_of(url: str) -> str:
+    """Shorten a URL to its domain for column headers"""
+    try:
+        if url.startswith(('http://', 'https://')):
+            domain = url.split('//')[1].split('/')[0]
+            # Remove www. if present
+            return domain.replace('www.', '')
+    except Exception:
+        pass
+    return url
+
+def create_excel_report(columns: Dict[str, List[str]], output: Output, table_rows: List[Tuple[str, str]]) -> None:
     """
     Create a formatted Excel report from analysis results
     
+    Uses xlsxwriter in constant_memory mode: each row is flushed to disk as soon
+    as the next one is started, so rows must be written strictly top to bottom.
+    Each field's values form one report row, so they are written with write_row.
+    
     Args:
-        results: List of dictionaries containing analysis data
-        filepath: Path where Excel file should be saved
+        columns: Analysis data column-wise - field key -> one string value per site
+        output: File path or writable binary file object (e.g. io.BytesIO)
         table_rows: List of (key, display_name) tuples defining the structure
     """
     
     # Create workbook and worksheet
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "RateMySite Analysis"
-    
-    # Define styles
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    
-    subheader_font = Font(bold=True, size=11)
-    subheader_fill = PatternFill(start_color="D9E2F3", end_color="D9E2F3", fill_type="solid")
-    
-    score_font = Font(bold=True)
-    
-    border = Border(
-        left=Side(border_style="thin"),
-        right=Side(border_style="thin"),
-        top=Side(border_style="thin"),
-        bottom=Side(border_style="thin")
-    )
-    
-    center_alignment = Alignment(horizontal="center", vertical="center")
-    left_alignment = Alignment(horizontal="left", vertical="center")
-    
-    # Add title and metadata
-    ws['A1'] = "RateMySite Analysis Report"
-    ws['A1'].font = Font(bold=True, size=16)
-    ws['A2'] = f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-    ws['A3'] = f"Total sites analyzed: {len(results)}"
-    
-    # Start data table at row 5
-    start_row = 5
-    current_row = start_row
-    
-    if not results:
-        ws[f'A{current_row}'] = "No results to display"
-        wb.save(filepath)
+    wb = xlsxwriter.Workbook(output, {
+        'constant_memory': True,
+        'strings_to_numbers': False,
+        'strings_to_formulas': False,
+        'strings_to_urls': False,
+    })
+    ws = wb.add_worksheet("RateMySite Analysis")
+    
+    # Define formats once, up front
+    title_fmt = wb.add_format({'bold': True, 'font_size': 16})
+    summary_title_fmt = wb.add_format({'bold': True, 'font_size': 14})
+    
+    header_fmt = wb.add_format({
+        'bold': True, 'font_color': '#FFFFFF', 'font_size': 12, 'bg_color': '#366092',
+        'align': 'center', 'valign': 'vcenter', 'border': 1,
+    })
+    subheader_fmt = wb.add_format({
+        'bold': True, 'font_size': 11, 'bg_color': '#D9E2F3',
+        'align': 'left', 'valign': 'vcenter', 'border': 1,
+    })
+    cell_fmt = wb.add_format({'align': 'center', 'valign': 'vcenter', 'border': 1})
+    link_fmt = wb.add_format({
+        'font_color': '#0000FF', 'underline': 1,
+        'align': 'center', 'valign': 'vcenter', 'border': 1,
+    })
+    score_fmts = {
+        level: wb.add_format({
+            'bold': True, 'bg_color': color,
+            'align': 'center', 'valign': 'vcenter', 'border': 1,
+        })
+        for level, color in (('high', '#C6EFCE'), ('medium', '#FFEB9C'), ('low', '#FFC7CE'))
+    }
+    
+    # Title and metadata
+    title = "RateMySite Analysis Report"
+    generated = f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+    site_count = len(next(iter(columns.values()), []))
+    total = f"Total sites analyzed: {site_count}"
+    
+    if not site_count:
+        ws.write_string(0, 0, title, title_fmt)
+        ws.write_string(1, 0, generated)
+        ws.write_string(2, 0, total)
+        ws.write_string(4, 0, "No results to display")
+        wb.close()
         return
     
-    # Create headers - Category column + one column per analyzed site
-    ws[f'A{current_row}'] = "Category"
-    ws[f'A{current_row}'].font = header_font
-    ws[f'A{current_row}'].fill = header_fill
-    ws[f'A{current_row}'].alignment = center_alignment
-    ws[f'A{current_row}'].border = border
-    
-    # Add URL headers
-    for col_idx, result in enumerate(results, start=2):
-        col_letter = chr(ord('A') + col_idx - 1)  # B, C, D, etc.
-        url = result.get('URL', 'Unknown')
-        
-        # Try to extract domain name for cleaner headers
-        try:
-            if url.startswith(('http://', 'https://')):
-                domain = url.split('//')[1].split('/')[0]
-                # Remove www. if present
-                domain = domain.replace('www.', '')
-            else:
-                domain = url
-        except:
-            domain = url
-            
-        ws[f'{col_letter}{current_row}'] = domain
-        ws[f'{col_letter}{current_row}'].font = header_font
-        ws[f'{col_letter}{current_row}'].fill = header_fill
-        ws[f'{col_letter}{current_row}'].alignment = center_alignment
-        ws[f'{col_letter}{current_row}'].border = border
-    
-    current_row += 1
-    
-    # Add data rows based on table_rows structure
-    for row_key, row_display in table_rows:
-        # Category name in column A
-        ws[f'A{current_row}'] = row_display
-        ws[f'A{current_row}'].font = subheader_font
-        ws[f'A{current_row}'].fill = subheader_fill
-        ws[f'A{current_row}'].alignment = left_alignment
-        ws[f'A{current_row}'].border = border
-        
-        # Data for each site
-        for col_idx, result in enumerate(results, start=2):
-            col_letter = chr(ord('A') + col_idx - 1)
-            
-            value = result.get(row_key, '-')
-            if value is None:
-                value = '-'
-            
-            cell = ws[f'{col_letter}{current_row}']
-            cell.value = str(value)
-            cell.border = border
-            cell.alignment = center_alignment
-            
-            # Special formatting for scores
-            if 'Score' in row_key and value != '-' and str(value).isdigit():
-                cell.font = score_font
-                score = int(value)
-                if score >= 80:
-                    cell.fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")  # Light green
-                elif score >= 60:
-                    cell.fill = PatternFill(start_color="FFEB9C", end_color="FFEB9C", fill_type="solid")  # Light yellow
-                elif score < 60:
-                    cell.fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")  # Light red
-            
-            # Special formatting for URLs (make them clickable)
-            elif row_key == 'URL' and value != '-':
-                cell.hyperlink = value
-                cell.font = Font(color="0000FF", underline="single")
-        
-        current_row += 1
-    
-    # Add summary section
-    current_row += 2
-    ws[f'A{current_row}'] = "Summary Statistics"
-    ws[f'A{current_row}'].font = Font(bold=True, size=14)
-    current_row += 1
+    # Lay out the table values first - column widths are set before any row
+    # is written
+    missing = ['-'] * site_count
+    headers = ["Category"] + [_domain_of(url) for url in columns.get('URL', ['Unknown'] * site_count)]
+    data_rows = [
+        (row_key, row_display, columns.get(row_key, missing))
+        for row_key, row_display in table_rows
+    ]
     
     # Calculate average scores
+    summary_rows = []
     score_fields = [key for key, _ in table_rows if 'Score' in key]
-    
     for score_field in score_fields:
-        scores = []
-        for result in results:
-            value = result.get(score_field, '-')
-            if value != '-' and str(value).isdigit():
-                scores.append(int(value))
+        scores = [int(v) for v in columns.get(score_field, missing) if v.isdigit()]
         
         if scores:
             avg_score = sum(scores) / len(scores)
-            ws[f'A{current_row}'] = f"Average {score_field}:"
-            ws[f'B{current_row}'] = f"{avg_score:.1f}"
-            current_row += 1
+            summary_rows.append((f"Average {score_field}:", f"{avg_score:.1f}"))
     
     # Auto-adjust column widths
-    for column in ws.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
+    widths = [len(h) for h in headers]
+    widths[0] = max([widths[0], len(title), len(generated), len(total), len("Summary Statistics")]
+                    + [len(row_display) for _, row_display, _ in data_rows]
+                    + [len(label) for label, _ in summary_rows])
+    for _, _, values in data_rows:
+        for col_idx, value in enumerate(values, start=1):
+            widths[col_idx] = max(widths[col_idx], len(value))
+    for _, avg in summary_rows:
+        widths[1] = max(widths[1], len(avg))
+    for col_idx, max_length in enumerate(widths):
+        # Set minimum and maximum widths
+        ws.set_column(col_idx, col_idx, min(max(max_length + 2, 10), 50))
+    
+    # Title and metadata (rows 1-3), data table starts at row 5
+    ws.write_string(0, 0, title, title_fmt)
+    ws.write_string(1, 0, generated)
+    ws.write_string(2, 0, total)
+    
+    # Headers - Category column + one column per analyzed site
+    row_idx = 4
+    ws.write_row(row_idx, 0, headers, header_fmt)
+    row_idx += 1
+    
+    # Data rows based on table_rows structure
+    for row_key, row_display, values in data_rows:
+        ws.write_string(row_idx, 0, row_display, subheader_fmt)
         
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
+        if 'Score' in row_key:
+            # Special formatting for scores
+            for col_idx, value in enumerate(values, start=1):
+                fmt = cell_fmt
+                if value.isdigit():
+                    score = int(value)
+                    if score >= 80:
+                        fmt = score_fmts['high']
+                    elif score >= 60:
+                        fmt = score_fmts['medium']
+                    else:
+                        fmt = score_fmts['low']
+                ws.write_string(row_idx, col_idx, value, fmt)
         
-        # Set minimum and maximum widths
-        adjusted_width = min(max(max_length + 2, 10), 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
+        elif row_key == 'URL':
+            # Special formatting for URLs (make them clickable)
+            for col_idx, value in enumerate(values, start=1):
+                if value != '-':
+                    ws.write_url(row_idx, col_idx, value, link_fmt, string=value)
+                else:
+                    ws.write_string(row_idx, col_idx, value, cell_fmt)
+        
+        else:
+            ws.write_row(row_idx, 1, values, cell_fmt)
+        
+        row_idx += 1
+    
+    # Summary section
+    row_idx += 2
+    ws.write_string(row_idx, 0, "Summary Statistics", summary_title_fmt)
+    row_idx += 1
+    for label, avg in summary_rows:
+        ws.write_row(row_idx, 0, (label, avg))
+        row_idx += 1
     
     # Save the workbook
-    wb.save(filepath)
+    wb.close()
 
 def create_detailed_excel_report(results: List[Dict[str, Any]], filepath: str) -> None:
     """
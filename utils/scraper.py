@@ -3,14 +3,19 @@
 RateMySite scraping logic with debugging - Railway/Docker compatible
 """
 
-import json
+import hashlib
 import re
-import time
 import traceback
 import os
+import queue
 import subprocess
 import shutil
-from typing import Dict, List, Optional, Generator
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Generator, Tuple, TypeVar
 
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -18,16 +23,32 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.common.exceptions import (
     TimeoutException,
-    NoSuchElementException,
     ElementClickInterceptedException,
+    InvalidSessionIdException,
+    JavascriptException,
+    NoSuchWindowException,
     StaleElementReferenceException,
     WebDriverException,
 )
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 RATEMYSITE_URL = "https://www.ratemysite.xyz/"
 DEFAULT_TIMEOUT = 45
+PARALLEL_WORKERS = max(1, int(os.environ.get("RMS_PARALLEL", 4)))
+DEBUG_EVENTS = bool(os.environ.get("RMS_DEBUG"))  # stream per-URL debug logs to the client
+REDIS_SOCKET_TIMEOUT = 5  # seconds before a Redis call is given up on
+
+# Open Chrome instances across all concurrent streams (each costs ~150 MB)
+_BROWSER_SLOTS = threading.BoundedSemaphore(PARALLEL_WORKERS)
+
+# Subresources that are pure overhead for a text scrape
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*google-analytics*", "*googletagmanager*", "*doubleclick*",
+]
 
 def _find_chrome_executable():
     """Find Chrome executable in different environments"""
@@ -99,12 +120,31 @@ def _make_driver(headless: bool = True) -> Optional[webdriver.Chrome]:
     chrome_opts.add_argument("--disable-web-security")
     chrome_opts.add_argument("--disable-features=VizDisplayCompositor")
     chrome_opts.add_argument("--window-size=1920,1080")
-    chrome_opts.add_argument("--remote-debugging-port=9222")
     chrome_opts.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36")
     
+    # Throwaway profile on tmpfs with no disk cache - keeps Chrome's per-navigation
+    # disk I/O off the container filesystem
+    profile_dir = tempfile.mkdtemp(prefix="chrome-", dir=_profile_root())
+    chrome_opts.add_argument(f"--user-data-dir={profile_dir}")
+    chrome_opts.add_argument("--disk-cache-dir=/dev/null")
+    chrome_opts.add_argument("--disable-application-cache")
+    chrome_opts.add_argument("--disable-background-networking")
+    chrome_opts.add_argument("--disable-sync")
+    chrome_opts.add_argument("--metrics-recording-only")
+    
+    # Don't download or render images / notifications - we only read page text
+    chrome_opts.add_argument("--blink-settings=imagesEnabled=false")
+    chrome_opts.add_experimental_option("prefs", {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.default_content_setting_values.notifications": 2,
+    })
+    
     if headless:
         chrome_opts.add_argument("--headless")
     
+    # Return from get() at DOMContentLoaded rather than waiting for every subresource
+    chrome_opts.page_load_strategy = "eager"
+    
     # Try to find chromedriver
     driver_path = _find_chromedriver()
     
@@ -112,38 +152,128 @@ def _make_driver(headless: bool = True) -> Optional[webdriver.Chrome]:
         if driver_path:
             # Use found chromedriver
             service = Service(driver_path)
-            return webdriver.Chrome(service=service, options=chrome_opts)
+            driver = webdriver.Chrome(service=service, options=chrome_opts)
         else:
             # Try to use webdriver-manager as fallback
             try:
                 from webdriver_manager.chrome import ChromeDriverManager
                 service = Service(ChromeDriverManager().install())
-                return webdriver.Chrome(service=service, options=chrome_opts)
+                driver = webdriver.Chrome(service=service, options=chrome_opts)
             except Exception as e:
                 print(f"ChromeDriverManager failed: {e}")
                 # Try without service (let selenium find chromedriver)
-                return webdriver.Chrome(options=chrome_opts)
+                driver = webdriver.Chrome(options=chrome_opts)
                 
     except WebDriverException as e:
         print(f"Failed to create Chrome driver: {e}")
+        shutil.rmtree(profile_dir, ignore_errors=True)
         return None
     except Exception as e:
         print(f"Unexpected error creating driver: {e}")
+        shutil.rmtree(profile_dir, ignore_errors=True)
         return None
+    
+    driver.profile_dir = profile_dir
+    # Bound how long a hung page can stall a worker; rely on explicit waits only
+    driver.set_page_load_timeout(DEFAULT_TIMEOUT)
+    driver.set_script_timeout(DEFAULT_TIMEOUT)
+    driver.implicitly_wait(0)
+    
+    _block_heavy_requests(driver)
+    return driver
+
+# Free tmpfs space wanted per concurrent Chrome profile before /dev/shm is used
+PROFILE_SHM_BYTES = 64 * 1024 * 1024
+
+def _profile_root() -> Optional[str]:
+    """
+    Directory for Chrome profiles - /dev/shm (tmpfs) when it has room for every
+    parallel browser's profile, otherwise the default temp dir.
+
+    Containers default /dev/shm to 64 MB (hence --disable-dev-shm-usage), which
+    RMS_PARALLEL profiles could fill mid-scrape.
+    """
+    if not (os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK)):
+        return None
+    try:
+        st = os.statvfs("/dev/shm")
+    except OSError:
+        return None
+    if st.f_bavail * st.f_frsize < PARALLEL_WORKERS * PROFILE_SHM_BYTES:
+        return None
+    return "/dev/shm"
+
+def _quit_driver(driver) -> None:
+    """Quit Chrome and remove its temporary profile directory"""
+    try:
+        driver.quit()
+    finally:
+        profile_dir = getattr(driver, "profile_dir", None)
+        if profile_dir:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+
+def _block_heavy_requests(driver) -> None:
+    """Block images, fonts and trackers at the network layer via CDP"""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+    except Exception as e:
+        # Purely an optimisation - the scrape works without it
+        print(f"Could not set blocked URLs: {e}")
+
+# Evaluates XPaths in priority order inside the page; returns the first match
+# of the first XPath whose match is visible (mirrors WebElement.is_displayed)
+_FIRST_VISIBLE_JS = """
+const isVisible = (el) => {
+  if (!el.getClientRects().length) return false;
+  const style = window.getComputedStyle(el);
+  return style.visibility !== 'hidden' && style.display !== 'none' && style.opacity !== '0';
+};
+for (const xp of arguments[0]) {
+  const el = document.evaluate(xp, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+  if (el && isVisible(el)) return el;
+}
+return null;
+"""
 
 def _find_first(driver, xpaths: List[str]) -> Optional[object]:
-    """Find first element matching any of the provided XPaths"""
-    for xp in xpaths:
-        try:
-            el = driver.find_element(By.XPATH, xp)
-            if el and el.is_displayed():
-                return el
-        except (NoSuchElementException, StaleElementReferenceException):
-            continue
-    return None
+    """Find first element matching any of the provided XPaths (one browser round-trip)"""
+    try:
+        return driver.execute_script(_FIRST_VISIBLE_JS, xpaths)
+    except JavascriptException:
+        return None
+
+# Clicks the first visible, enabled button whose text contains a keyword, trying
+# keywords in priority order - one round-trip instead of an XPath probe per keyword
+_CLICK_BY_TEXT_JS = """
+const isVisible = (el) => {
+  if (!el.getClientRects().length) return false;
+  const style = window.getComputedStyle(el);
+  return style.visibility !== 'hidden' && style.display !== 'none' && style.opacity !== '0';
+};
+const btns = [...document.querySelectorAll("button,[role=button]")]
+  .filter(b => !b.disabled && isVisible(b));
+for (const kw of arguments[0]) {
+  const k = kw.toLowerCase();
+  const b = btns.find(b => (b.innerText || b.textContent || '').toLowerCase().includes(k));
+  if (b) { b.click(); return true; }
+}
+return false;
+"""
+
+def _click_button_by_text(driver, keywords: List[str]) -> bool:
+    """Click the best keyword-matching button in-page; False if none was clicked"""
+    try:
+        return bool(driver.execute_script(_CLICK_BY_TEXT_JS, keywords))
+    except JavascriptException:
+        return False
 
 def _click_best_button(driver) -> bool:
     """Try to find and click the best submit button"""
+    if _click_button_by_text(driver, ["analy", "rate", "submit", "generate", "get report"]):
+        return True
+    
+    # Fallback: XPath probes, down to a generic submit / any button
     xpaths = [
         "//button[contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'),'analy')]",
         "//button[contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'),'rate')]",
@@ -170,6 +300,13 @@ def _click_best_button(driver) -> bool:
 
 def _maybe_close_cookie_banner(driver):
     """Attempt to close cookie banners"""
+    try:
+        if _click_button_by_text(driver, ["accept", "agree", "allow", "ok"]):
+            return
+    except Exception:
+        pass
+    
+    # Fallback: XPath probes, including cookie containers and known consent buttons
     candidates = [
         "//button[contains(translate(.,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'accept')]",
         "//button[contains(translate(.,'ABCDEFGHIJKLMNOPQRSTUVWXYZ','abcdefghijklmnopqrstuvwxyz'),'agree')]",
@@ -185,52 +322,191 @@ def _maybe_close_cookie_banner(driver):
                 btn.click()
             except ElementClickInterceptedException:
                 driver.execute_script("arguments[0].click();", btn)
-            time.sleep(0.3)
     except Exception:
         pass
 
+# Collects result containers' text in-page instead of one round-trip per element
+_RESULT_TEXT_JS = """
+const sel = "[class*=result],[class*=report],[class*=output],[role=article]";
+const out = [];
+document.querySelectorAll(sel).forEach(n => {
+  const t = (n.innerText || '').trim();
+  if (t) out.push(t);
+});
+return out.length ? out.join('\\n\\n') : ((document.body && document.body.innerText) || '').trim();
+"""
+
+_BODY_TEXT_LEN_JS = "return document.body ? document.body.innerText.length : 0;"
+
 def _collect_result_text(driver) -> str:
     """Extract result text from the page"""
-    containers = driver.find_elements(
-        By.XPATH,
-        "//*[contains(@class,'result') or contains(@class,'report') or contains(@class,'output') or @role='article']",
-    )
-    texts = [c.text.strip() for c in containers if c.text and c.text.strip()]
-    if texts:
-        return "\n\n".join(texts).strip()
     try:
-        body = driver.find_element(By.TAG_NAME, "body")
-        return (body.text or "").strip()
-    except Exception:
+        return (driver.execute_script(_RESULT_TEXT_JS) or "").strip()
+    except JavascriptException:
         return ""
 
+def _body_text_len(driver) -> int:
+    """Length of the page's visible body text"""
+    return driver.execute_script(_BODY_TEXT_LEN_JS) or 0
+
 def _wait_for_content_growth(driver, wait: WebDriverWait, min_growth: int = 80) -> None:
     """Wait for content to grow (indicating dynamic loading)"""
     try:
-        initial_len = len(driver.find_element(By.TAG_NAME, "body").text)
+        initial_len = _body_text_len(driver)
     except Exception:
         initial_len = 0
     try:
-        wait.until(lambda d: len(d.find_element(By.TAG_NAME, "body").text) > initial_len + min_growth)
+        wait.until(lambda d: _body_text_len(d) > initial_len + min_growth)
     except TimeoutException:
         pass
 
-def _analyze_one_with_debugging(target_url: str, timeout: int = DEFAULT_TIMEOUT) -> tuple[str, List[str]]:
-    """Analyze a single URL with detailed debugging"""
-    debug_log = []
-    
+def _wait_for_text_stable(driver, timeout: float = 3.0, interval: float = 0.25) -> None:
+    """Wait until the body text length stops changing between two polls"""
+    last_len = [-1]
+
+    def stable(d) -> bool:
+        cur_len = _body_text_len(d)
+        unchanged = cur_len == last_len[0]
+        last_len[0] = cur_len
+        return unchanged
+
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=interval).until(stable)
+    except TimeoutException:
+        pass
+
+class _ResultCache:
+    """
+    Today's raw RateMySite text per URL, so repeat submissions skip the browser.
+
+    Entries live in Redis (``rms:result:{sha1(url)}:{YYYYMMDD}``, one-day TTL) when
+    REDIS_URL is set, otherwise in a small process-local LRU. Cache failures are
+    never fatal - the URL is simply scraped again.
+    """
+
+    TTL = 86400
+
+    def __init__(self, redis_url: Optional[str] = None, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._redis = None
+        self._local: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        if redis_url:
+            import redis
+            self._redis = redis.Redis.from_url(
+                redis_url,
+                socket_timeout=REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+                encoding_errors="replace",
+            )
+
+    @staticmethod
+    def _key(url: str) -> str:
+        digest = hashlib.sha1(url.encode()).hexdigest()
+        return f"rms:result:{digest}:{datetime.now(timezone.utc):%Y%m%d}"
+
+    def get(self, url: str) -> Optional[str]:
+        key = self._key(url)
+        if self._redis is not None:
+            try:
+                cached = self._redis.get(key)
+            except Exception as e:
+                print(f"Result cache read failed: {e}")
+                return None
+            return cached.decode() if cached is not None else None
+        with self._lock:
+            cached = self._local.get(key)
+            if cached is not None:
+                self._local.move_to_end(key)
+            return cached
+
+    def set(self, url: str, raw_text: str) -> None:
+        key = self._key(url)
+        if self._redis is not None:
+            try:
+                self._redis.setex(key, self.TTL, raw_text)
+            except Exception as e:
+                print(f"Result cache write failed: {e}")
+            return
+        with self._lock:
+            self._local[key] = raw_text
+            self._local.move_to_end(key)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+result_cache = _ResultCache(os.environ.get("REDIS_URL"))
+
+class _BrowserSession:
+    """
+    A Chrome driver reused across URLs, rebuilt only after it crashes.
+
+    An open driver holds one of the process-wide _BROWSER_SLOTS, so starting a
+    browser waits while RMS_PARALLEL browsers are already open in other streams.
+    """
+
+    def __init__(self, headless: bool = True):
+        self.headless = headless
+        self.driver: Optional[webdriver.Chrome] = None
+
+    @property
+    def needs_start(self) -> bool:
+        return self.driver is None
+
+    def start(self) -> bool:
+        """Create the driver; returns False if Chrome could not be started"""
+        _BROWSER_SLOTS.acquire()
+        try:
+            self.driver = _make_driver(headless=self.headless)
+        finally:
+            if self.driver is None:
+                _BROWSER_SLOTS.release()
+        return self.driver is not None
+
+    def reset(self) -> None:
+        """Isolate the next URL from whatever the previous one left behind"""
+        self.driver.delete_all_cookies()
+        self.driver.get("about:blank")
+
+    def close(self) -> None:
+        if self.driver is not None:
+            try:
+                _quit_driver(self.driver)
+            except Exception:
+                pass
+            self.driver = None
+            _BROWSER_SLOTS.release()
+
+# Messages of WebDriverExceptions raised when Chrome itself has gone away
+_BROWSER_DEAD_MESSAGES = ("chrome not reachable", "disconnected", "session deleted", "target window already closed")
+
+def _is_browser_dead(exc: BaseException) -> bool:
+    """True when ``exc`` means Chrome or chromedriver is gone, not that the page misbehaved"""
+    if isinstance(exc, (InvalidSessionIdException, NoSuchWindowException)):
+        return True
+    if isinstance(exc, (Urllib3HTTPError, ConnectionError)):
+        # chromedriver itself is unreachable (e.g. MaxRetryError)
+        return True
+    if isinstance(exc, WebDriverException):
+        msg = (exc.msg or "").lower()
+        return any(m in msg for m in _BROWSER_DEAD_MESSAGES)
+    return False
+
+def _analyze_one(driver, target_url: str, timeout: int, debug_log: List[str]) -> str:
+    """
+    Run one URL through RateMySite on an existing driver.
+
+    Errors meaning the browser has died are propagated so the caller can rebuild
+    it; page-level errors are logged and give an empty result.
+    """
     try:
-        debug_log.append("Creating Chrome driver...")
-        driver = _make_driver(headless=True)
-        
-        if not driver:
-            debug_log.append("ERROR: Failed to create Chrome driver - Chrome may not be installed")
-            return "", debug_log
-            
         wait = WebDriverWait(driver, timeout)
         
         debug_log.append(f"Navigating to {RATEMYSITE_URL}")
-        driver.get(RATEMYSITE_URL)
+        try:
+            driver.get(RATEMYSITE_URL)
+        except TimeoutException:
+            # Partial content is often enough to find the input field
+            debug_log.append("Page load timed out, continuing with partial content...")
         
         debug_log.append("Checking for cookie banners...")
         _maybe_close_cookie_banner(driver)
@@ -261,7 +537,7 @@ def _analyze_one_with_debugging(target_url: str, timeout: int = DEFAULT_TIMEOUT)
                 debug_log.append(f"Body text: {body_text}")
             except Exception as e:
                 debug_log.append(f"Could not get body text: {e}")
-            return "", debug_log
+            return ""
 
         debug_log.append(f"Entering URL: {target_url}")
         try:
@@ -269,7 +545,13 @@ def _analyze_one_with_debugging(target_url: str, timeout: int = DEFAULT_TIMEOUT)
         except Exception:
             pass
         input_el.send_keys(target_url)
-        time.sleep(0.3)
+        try:
+            # A re-rendered (stale) input is polled again rather than failing the URL
+            WebDriverWait(driver, 2, ignored_exceptions=(StaleElementReferenceException,)).until(
+                lambda d: input_el.get_attribute("value") == target_url
+            )
+        except TimeoutException:
+            debug_log.append("Input value does not match the URL, submitting anyway")
 
         debug_log.append("Attempting to submit...")
         clicked = _click_best_button(driver)
@@ -296,7 +578,7 @@ def _analyze_one_with_debugging(target_url: str, timeout: int = DEFAULT_TIMEOUT)
             _wait_for_content_growth(driver, wait, min_growth=120)
             debug_log.append("Finished waiting for content growth")
 
-        time.sleep(1.0)
+        _wait_for_text_stable(driver)
         debug_log.append("Extracting result text...")
         result_text = _collect_result_text(driver)
         debug_log.append(f"Extracted {len(result_text)} characters of result text")
@@ -310,63 +592,250 @@ def _analyze_one_with_debugging(target_url: str, timeout: int = DEFAULT_TIMEOUT)
             except Exception as e:
                 debug_log.append(f"Could not get page text: {e}")
         
-        return result_text, debug_log
+        return result_text
 
     except Exception as e:
+        if _is_browser_dead(e):
+            raise
         debug_log.append(f"ERROR in analysis: {e}")
         debug_log.append(f"Traceback: {traceback.format_exc()}")
-        return "", debug_log
-    finally:
+        return ""
+
+def _analyze_one_with_debugging(browser: _BrowserSession, target_url: str,
+                                timeout: int = DEFAULT_TIMEOUT) -> tuple[str, List[str]]:
+    """Analyze a single URL with detailed debugging, restarting the browser once on failure"""
+    debug_log = []
+    
+    for attempt in range(2):
         try:
-            if 'driver' in locals() and driver:
-                debug_log.append("Closing driver...")
-                driver.quit()
+            if browser.needs_start:
+                debug_log.append("Creating Chrome driver...")
+                if not browser.start():
+                    debug_log.append("ERROR: Failed to create Chrome driver - Chrome may not be installed")
+                    return "", debug_log
+            else:
+                debug_log.append("Reusing Chrome driver...")
+                browser.reset()
+            
+            return _analyze_one(browser.driver, target_url, timeout, debug_log), debug_log
+        
+        # _analyze_one only lets browser-death errors out; a failed reset() means
+        # the old browser can't be reused either
         except Exception as e:
-            debug_log.append(f"Error closing driver: {e}")
+            debug_log.append(f"ERROR: browser failure: {e}")
+            debug_log.append("Closing driver...")
+            browser.close()
+            if attempt == 0:
+                debug_log.append("Retrying with a fresh browser...")
+    
+    return "", debug_log
+
+# Label variants recognised for each parsed field
+_COMPANY_LABELS = ("Company", "Site Name", "Website Name")
+_DESCRIPTION_LABELS = ("Description of Website", "Description", "Site Description")
+_SCORE_LABELS = {
+    "Overall Score": ("Overall Score", "Score", "Total Score"),
+    "Consumer Score": ("Consumer Score", "Customer Score", "End-user Score"),
+    "Developer Score": ("Developer Score", "Engineer Score", "Dev Score"),
+    "Investor Score": ("Investor Score",),
+    "Clarity Score": ("Clarity Score", "Readability Score"),
+    "Visual Design Score": ("Visual Design Score", "Design Score"),
+    "UX Score": ("UX Score", "Usability Score"),
+    "Trust Score": ("Trust Score", "Credibility Score"),
+    "Value Prop Score": ("Value Prop Score", "Value Proposition Score"),
+}
+
+def _block_pattern(lab: str, group: str = "(") -> str:
+    return rf"{lab}\s*[:\-]?\s*{group}.+?)(?:\n\s*\n|\n[A-Za-z][^\n]{{0,60}}:\s|$)"
+
+def _line_pattern(lab: str, group: str = "(") -> str:
+    return rf"{lab}\s*[:\-]?\s*{group}[^\n]+)"
 
-def _grab_block(text: str, labels: List[str], multiline=True) -> str:
+def _score_pattern(lab: str, group: str = "(") -> str:
+    return rf"{lab}\s*[:\-]?\s*{group}\d{{1,3}})"
+
+# Patterns compiled once at import rather than on every parse
+_TEXT_LABELS = _COMPANY_LABELS + _DESCRIPTION_LABELS
+_BLOCK_RES = {lab: re.compile(_block_pattern(lab), re.I | re.S) for lab in _TEXT_LABELS}
+_LINE_RES = {lab: re.compile(_line_pattern(lab), re.I) for lab in _TEXT_LABELS}
+_SCORE_RES = {
+    lab: re.compile(_score_pattern(lab), re.I)
+    for labels in _SCORE_LABELS.values()
+    for lab in labels
+}
+
+# (field, labels, pattern builder) for every field extracted from the raw text
+_FIELD_SPECS = [
+    ("Company", _COMPANY_LABELS, _line_pattern),
+    ("Description of Website", _DESCRIPTION_LABELS, _block_pattern),
+] + [(field, labels, _score_pattern) for field, labels in _SCORE_LABELS.items()]
+
+# Every label of every field in one alternation, scanned with a single finditer.
+# Each alternative sits in a zero-width lookahead so matches never consume text:
+# a label nested in another one ("Score" in "Consumer Score") is still seen,
+# exactly as the per-label searches would see it. The scan runs case-sensitively
+# over lowercased text, which lets re skip non-candidate positions quickly.
+_FIELD_GROUPS: Dict[str, Tuple[str, int]] = {}
+_alternatives = []
+for _fi, (_field, _labels, _pattern) in enumerate(_FIELD_SPECS):
+    for _rank, _lab in enumerate(_labels):
+        _name = f"f{_fi}_{_rank}"
+        _FIELD_GROUPS[_name] = (_field, _rank)
+        _alternatives.append(_pattern(_lab.lower(), group=f"(?P<{_name}>"))
+_ALL_FIELDS_RE = re.compile("(?=" + "|".join(_alternatives) + ")", re.S)
+del _fi, _field, _labels, _pattern, _rank, _lab, _name, _alternatives
+
+def _grab_block(text: str, labels: Tuple[str, ...], multiline=True) -> str:
     """Extract a block of text based on labels"""
+    patterns = _BLOCK_RES if multiline else _LINE_RES
     for lab in labels:
-        if multiline:
-            m = re.search(rf"{lab}\s*[:\-]?\s*(.+?)(?:\n\s*\n|\n[A-Z][^\n]{{0,60}}:\s|$)", text, flags=re.I | re.S)
-        else:
-            m = re.search(rf"{lab}\s*[:\-]?\s*([^\n]+)", text, flags=re.I)
+        m = patterns[lab].search(text)
         if m:
             return m.group(1).strip()
     return "-"
 
-def _grab_score(text: str, labels: List[str]) -> str:
+def _grab_score(text: str, labels: Tuple[str, ...]) -> str:
     """Extract a numeric score based on labels"""
     for lab in labels:
-        m = re.search(rf"{lab}\s*[:\-]?\s*(\d{{1,3}})", text, flags=re.I)
+        m = _SCORE_RES[lab].search(text)
         if m:
             return m.group(1)
     return "-"
 
+def _scan_fields(raw: str) -> Optional[Dict[str, str]]:
+    """
+    Extract every field in one pass over ``raw``.
+
+    For each field the most preferred label that occurs wins, using that label's
+    first occurrence - the same result as calling _grab_block/_grab_score per field.
+    Returns None when lowercasing changes the text length (offsets would not line up).
+    """
+    low = raw.lower()
+    if len(low) != len(raw):
+        return None
+    best: Dict[str, Tuple[int, str]] = {}
+    for m in _ALL_FIELDS_RE.finditer(low):
+        field, rank = _FIELD_GROUPS[m.lastgroup]
+        if field not in best or rank < best[field][0]:
+            best[field] = (rank, raw[m.start(m.lastgroup):m.end(m.lastgroup)].strip())
+            if len(best) == len(_FIELD_SPECS) and all(r == 0 for r, _ in best.values()):
+                break
+    return {field: value for field, (_, value) in best.items()}
+
 def _parse_fields(url: str, raw: str) -> Dict[str, str]:
     """Parse the raw text into structured fields"""
-    return {
-        "Company": _grab_block(raw, ["Company", "Site Name", "Website Name"], multiline=False),
+    found = _scan_fields(raw)
+    if found is None:
+        found = {
+            field: (_grab_score(raw, labels) if pattern is _score_pattern
+                    else _grab_block(raw, labels, multiline=pattern is _block_pattern))
+            for field, labels, pattern in _FIELD_SPECS
+        }
+    fields = {
+        "Company": found.get("Company", "-"),
         "URL": url,
-        "Overall Score": _grab_score(raw, ["Overall Score", "Score", "Total Score"]),
-        "Description of Website": _grab_block(raw, ["Description of Website", "Description", "Site Description"]),
-        "Consumer Score": _grab_score(raw, ["Consumer Score", "Customer Score", "End-user Score"]),
-        "Developer Score": _grab_score(raw, ["Developer Score", "Engineer Score", "Dev Score"]),
-        "Investor Score": _grab_score(raw, ["Investor Score"]),
-        "Clarity Score": _grab_score(raw, ["Clarity Score", "Readability Score"]),
-        "Visual Design Score": _grab_score(raw, ["Visual Design Score", "Design Score"]),
-        "UX Score": _grab_score(raw, ["UX Score", "Usability Score"]),
-        "Trust Score": _grab_score(raw, ["Trust Score", "Credibility Score"]),
-        "Value Prop Score": _grab_score(raw, ["Value Prop Score", "Value Proposition Score"]),
-        "_raw": raw,
+        "Overall Score": found.get("Overall Score", "-"),
+        "Description of Website": found.get("Description of Website", "-"),
     }
+    for field in _SCORE_LABELS:
+        if field != "Overall Score":
+            fields[field] = found.get(field, "-")
+    fields["_raw"] = raw
+    return fields
 
-def sse(event: str, data: dict) -> str:
-    """Format Server-Sent Event"""
-    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+# Analysis events are (event name, payload) pairs; SSE framing happens in app.py
+Event = Tuple[str, Dict[str, Any]]
+T = TypeVar("T")
 
-def stream_analysis(urls: List[str]) -> Generator[str, None, None]:
-    """Stream analysis results for multiple URLs"""
+def _analyze_url(idx: int, total: int, raw: str, browser: _BrowserSession,
+                 emit: Callable[[Event], None]) -> None:
+    """Run one URL end to end, passing each event to ``emit``"""
+    url = raw if raw.startswith(("http://", "https://")) else "https://" + raw
+    step_total = 5
+    cur = 0
+
+    print(f"[{idx}/{total}] Start {url}")
+    emit(("start_url", {"index": idx, "url": url}))
+
+    raw_text = cached = result_cache.get(url)
+    if cached:
+        cur += 2
+        debug_messages = ["Cache hit - reusing today's RateMySite result"]
+    else:
+        cur += 1
+        if browser.needs_start:
+            emit(("progress", {"index": idx, "phase": "Creating fresh browser", "p": cur, "of": step_total}))
+
+        cur += 1
+        emit(("progress", {"index": idx, "phase": "Submitting to RateMySite", "p": cur, "of": step_total}))
+        
+        raw_text, debug_messages = _analyze_one_with_debugging(browser, url, timeout=DEFAULT_TIMEOUT)
+    
+    if DEBUG_EVENTS and debug_messages:
+        emit(("debug_batch", {"index": idx, "messages": debug_messages}))
+
+    cur += 1
+    emit(("progress", {"index": idx, "phase": "Parsing output", "p": cur, "of": step_total}))
+    
+    if raw_text:
+        data = _parse_fields(url, raw_text)
+        if not cached and data["Overall Score"] != "-":
+            # A failed submit still yields text (the landing page) - only keep real reports
+            result_cache.set(url, raw_text)
+        emit(("result", {"index": idx, "url": url, "data": data}))
+    else:
+        error = "No results found - check debug log" if DEBUG_EVENTS else "No results found"
+        emit(("result", {"index": idx, "url": url, "error": error}))
+
+    cur += 1
+    emit(("progress", {"index": idx, "phase": "Done", "p": cur, "of": step_total}))
+    print(f"[{idx}/{total}] Done {url}")
+
+class _OrderedRelease:
+    """
+    Releases per-URL events in URL order from whichever worker produced them.
+
+    The head URL's events go straight through; later URLs are buffered until
+    everything before them has finished.
+    """
+
+    def __init__(self, total: int, release: Callable[[Event], None]):
+        self.total = total
+        self._release = release
+        self._lock = threading.Lock()
+        self._buffered: Dict[int, List[Event]] = {}
+        self._completed = set()
+        self._next = 1
+
+    def emit(self, idx: int, event: Event) -> None:
+        with self._lock:
+            if idx == self._next:
+                self._release(event)
+            else:
+                self._buffered.setdefault(idx, []).append(event)
+
+    def finish(self, idx: int) -> bool:
+        """Mark a URL as done; True once every URL's events have been released"""
+        with self._lock:
+            self._completed.add(idx)
+            while self._next in self._completed:
+                self._next += 1
+                for event in self._buffered.pop(self._next, []):
+                    self._release(event)
+            return self._next > self.total
+
+def _as_event(event: str, data: Dict[str, Any]) -> Event:
+    return event, data
+
+def stream_analysis(urls: List[str],
+                    frame: Callable[[str, Dict[str, Any]], T] = _as_event) -> Generator[T, None, None]:
+    """
+    Stream analysis results for multiple URLs
+
+    ``frame(event, data)`` turns each event into what the generator yields (by
+    default the ``(event, data)`` pair). For per-URL events it runs on the worker
+    threads, in URL order, so the consuming generator only has to pass items on.
+    """
     total = len(urls)
     
     TABLE_ROWS = [
@@ -384,38 +853,73 @@ def stream_analysis(urls: List[str]) -> Generator[str, None, None]:
         ("Value Prop Score", "Value Proposition"),
     ]
     
-    yield sse("init", {"total": total, "rows": TABLE_ROWS})
+    yield frame("init", {"total": total, "rows": TABLE_ROWS})
 
-    for idx, raw in enumerate(urls, start=1):
-        url = raw if raw.startswith(("http://", "https://")) else "https://" + raw
-        step_total = 5
-        cur = 0
+    if urls:
+        # URLs run concurrently, one reused browser per worker thread. Each worker
+        # drains the stream's URL queue and closes its browser once the queue is
+        # empty, handing its _BROWSER_SLOTS slot (open browsers across all streams,
+        # keep RMS_PARALLEL small) to whichever stream is waiting for one.
+        todo: "queue.SimpleQueue[Tuple[int, str]]" = queue.SimpleQueue()
+        for item in enumerate(urls, start=1):
+            todo.put(item)
+        stopped = threading.Event()
+        frames: "queue.SimpleQueue[Optional[T]]" = queue.SimpleQueue()
 
-        print(f"[{idx}/{total}] Start {url}")
-        yield sse("start_url", {"index": idx, "url": url})
+        def release(event: Event) -> None:
+            name, data = event
+            try:
+                item = frame(name, data)
+            except Exception as e:
+                # Report an unframeable event on its URL rather than losing the stream
+                print(f"Could not frame {name} event: {e}")
+                item = frame("result", {"index": data.get("index"), "url": data.get("url"),
+                                        "error": f"Could not send {name}: {e}"})
+            frames.put(item)
 
-        cur += 1
-        yield sse("progress", {"index": idx, "phase": "Creating fresh browser", "p": cur, "of": step_total})
+        ordered = _OrderedRelease(total, release)
 
-        cur += 1
-        yield sse("progress", {"index": idx, "phase": "Submitting to RateMySite", "p": cur, "of": step_total})
-        
-        raw_text, debug_messages = _analyze_one_with_debugging(url, timeout=DEFAULT_TIMEOUT)
-        
-        for msg in debug_messages:
-            yield sse("debug", {"index": idx, "message": msg})
+        def analyze(idx: int, raw: str, browser: _BrowserSession) -> None:
+            try:
+                _analyze_url(idx, total, raw, browser, lambda event: ordered.emit(idx, event))
+            except Exception as e:
+                ordered.emit(idx, ("result", {"index": idx, "url": raw, "error": f"Analysis failed: {e}"}))
+            finally:
+                try:
+                    all_released = ordered.finish(idx)
+                except Exception as e:
+                    # The consumer must always get its sentinel, or it waits forever
+                    print(f"Releasing events after URL {idx} failed: {e}")
+                    all_released = True
+                if all_released:
+                    frames.put(None)
 
-        cur += 1
-        yield sse("progress", {"index": idx, "phase": "Parsing output", "p": cur, "of": step_total})
-        
-        if raw_text:
-            data = _parse_fields(url, raw_text)
-            yield sse("result", {"index": idx, "url": url, "data": data})
-        else:
-            yield sse("result", {"index": idx, "url": url, "error": "No results found - check debug log"})
+        def work() -> None:
+            browser = _BrowserSession(headless=True)
+            try:
+                while not stopped.is_set():
+                    try:
+                        idx, raw = todo.get_nowait()
+                    except queue.Empty:
+                        break
+                    analyze(idx, raw, browser)
+            finally:
+                browser.close()
 
-        cur += 1
-        yield sse("progress", {"index": idx, "phase": "Done", "p": cur, "of": step_total})
-        print(f"[{idx}/{total}] Done {url}")
+        workers = min(PARALLEL_WORKERS, total)
+        pool = ThreadPoolExecutor(max_workers=workers)
+        finished = False
+        try:
+            for _ in range(workers):
+                pool.submit(work)
+
+            while (item := frames.get()) is not None:
+                yield item
+            finished = True
+        finally:
+            # Client going away mid-batch stops the workers after their current URL,
+            # without blocking the response on running scrapes
+            stopped.set()
+            pool.shutdown(wait=finished)
 
-    yield sse("done", {"ok": True})
+    yield frame("done", {"ok": True})
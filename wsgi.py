@@ -0,0 +1,11 @@
+#!/usr/bin/env python3
+"""
+Production WSGI entrypoint - gevent-patches the stdlib before the app is imported
+so every /stream client is a greenlet rather than an OS thread
+"""
+
+from gevent import monkey
+
+monkey.patch_all()
+
+from app import app as application  # noqa: E402